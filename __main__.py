@@ -1,27 +1,35 @@
 import time
 start = time.time()
 
+import copy
+import os
 import random
-from rust_poker_env import PokerEnv, Phase, Action
+from concurrent.futures import ProcessPoolExecutor
+# Workers unpickle the agents and play_shard by module name, so they live in an importable module
+from agents import DummyAgent, play_shard
 
-class DummyAgent:
-    def choose_action(self, state, available_actions):
-        if not available_actions:
-            return
-        
-        pick = random.choice(available_actions)
-        
-        if pick[0] == "raise":
-            n = random.randint(pick[1][0], pick[1][1])
-            return ('raise', n)
-        return pick
-    
-    def learn(self):
-        pass
+if __name__ == "__main__":
+    agents = [DummyAgent() for _ in range(8)]
+    episode = 2
 
-agents = [DummyAgent() for _ in range(8)]
-env = PokerEnv(agents, small_blind=10, big_blind=20, initial_stack=100)
-env.play_game(verbose=False, episode=2)
+    workers = min(os.cpu_count() or 1, episode)
+    seeds = random.SystemRandom()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards = [
+            executor.submit(
+                play_shard,
+                copy.deepcopy(agents),
+                episode // workers + (w < episode % workers),
+                seeds.randrange(2**32),
+            )
+            for w in range(workers)
+        ]
 
-end = time.time()
-print(f"Durée d'exécution : {end - start} secondes")
+        # Stateful agents fold what each copy learned back into the original
+        for shard in shards:
+            for agent, trained in zip(agents, shard.result() or ()):
+                if hasattr(agent, "merge"):
+                    agent.merge(trained)
+
+    end = time.time()
+    print(f"Durée d'exécution : {end - start} secondes")
@@ -0,0 +1,67 @@
+import random
+from array import array
+from rust_poker_env import PokerEnv, RAISE
+
+class DummyAgent:
+    supports_batch = False
+    buffer_size = 1 << 16
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.Random()
+        self._refill()
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+        self._refill()
+
+    def __getstate__(self):
+        # The buffer is redrawn rather than shipped to and from the workers
+        state = self.__dict__.copy()
+        del state["_buf"], state["_i"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buf = array("I")
+        self._i = self.buffer_size
+
+    def _refill(self):
+        # Random ints are drawn in bulk, one PRNG call per buffer instead of two per decision
+        self._buf = array("I")
+        self._buf.frombytes(self.rng.randbytes(self.buffer_size * self._buf.itemsize))
+        self._i = 0
+
+    def choose_action(self, state, available_actions):
+        if not available_actions:
+            return
+
+        i = self._i
+        if i + 2 > self.buffer_size:
+            self._refill()
+            i = 0
+        self._i = i + 2
+        
+        pick = available_actions[self._buf[i] % len(available_actions)]
+        
+        if pick[0] == RAISE:
+            low, high = pick[1]
+            n = low + self._buf[i + 1] % (high - low + 1)
+            return (RAISE, n)
+        return pick
+    
+    def learn(self):
+        pass
+
+def play_shard(agents, episode, seed):
+    # Each worker plays its own games with its own copy of the agents, reseeded so that
+    # the copies don't replay the same draws
+    rng = random.Random(seed)
+    for agent in agents:
+        if hasattr(agent, "seed"):
+            agent.seed(rng.getrandbits(64))
+    env = PokerEnv(agents, small_blind=10, big_blind=20, initial_stack=100, seed=rng.getrandbits(64))
+    env.play_game(verbose=False, episode=episode)
+    # Agents are only sent back when there is something to merge
+    if any(hasattr(agent, "merge") for agent in agents):
+        return agents
+    return None
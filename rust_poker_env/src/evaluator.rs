@@ -0,0 +1,373 @@
+use std::collections::HashMap;
+use std::sync::OnceLock;
+
+/// One prime per rank (2 .. A), the product of a hand's primes identifies its ranks
+pub const PRIMES: [u32; 13] = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41];
+
+const RANK_CHARS: [char; 13] = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A'];
+const SUIT_CHARS: [char; 4] = ['h', 'd', 'c', 's'];
+// Position of each suit in the cdhs nibble
+const SUIT_BITS: [u32; 4] = [0x2000, 0x4000, 0x8000, 0x1000];
+
+// Straights from the best (A high) to the worst (5 high, the wheel) as rank bitmasks
+const STRAIGHTS: [u16; 10] = [
+    0x1F00, 0x0F80, 0x07C0, 0x03E0, 0x01F0, 0x00F8, 0x007C, 0x003E, 0x001F, 0x100F,
+];
+
+// First (best) rank value of each hand category, 1 is a royal flush and 7462 the worst high card
+const FOUR_OF_A_KIND: u16 = 11;
+const FULL_HOUSE: u16 = 167;
+const FLUSH: u16 = 323;
+const STRAIGHT: u16 = 1600;
+const THREE_OF_A_KIND: u16 = 1610;
+const TWO_PAIR: u16 = 2468;
+const ONE_PAIR: u16 = 3326;
+const HIGH_CARD: u16 = 6186;
+
+// Key of each rank, the sums of the keys of any 7 ranks (each used at most 4 times) are all distinct
+const RANK_KEYS: [u32; 13] = [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181];
+// The unsuited table is a perfect hash of these sums: high bits pick a row offset, low bits the column
+const ROW_SHIFT: u32 = 6;
+
+/// Encode a card as a Cactus-Kev int: xxxbbbbb bbbbbbbb cdhsrrrr xxpppppp
+pub const fn encode(rank: usize, suit: usize) -> u32 {
+    (1 << (16 + rank)) | SUIT_BITS[suit] | ((rank as u32) << 8) | PRIMES[rank]
+}
+
+/// Encoded 52 cards deck ordered by rank then suit, built at compile time
+pub const DECK: [u32; 52] = {
+    let mut deck = [0u32; 52];
+    let mut i = 0;
+    while i < 52 {
+        deck[i] = encode(i / 4, i % 4);
+        i += 1;
+    }
+    deck
+};
+
+/// Readable form of an encoded card ("Ah", "Td", ...)
+pub fn card_to_string(card: u32) -> String {
+    let rank = ((card >> 8) & 0xF) as usize;
+    let suit = SUIT_BITS.iter().position(|&bit| card & bit != 0).unwrap_or(0);
+    format!("{}{}", RANK_CHARS[rank], SUIT_CHARS[suit])
+}
+
+/// Lookup tables of the 7 cards evaluator, lower value means stronger hand
+pub struct Evaluator {
+    flush: Vec<u16>,
+    rows: Vec<u16>,
+    unsuited: Vec<u16>,
+}
+
+impl Evaluator {
+    fn new() -> Self {
+        // 5 cards tables
+        let mut flush5 = vec![0u16; 1 << 13];
+        let mut unsuited5: HashMap<u64, u16> = HashMap::new();
+
+        let mut distinct: Vec<u16> = (0u16..1 << 13)
+            .filter(|m| m.count_ones() == 5 && !STRAIGHTS.contains(m))
+            .collect();
+        distinct.sort_unstable_by(|a, b| b.cmp(a));
+
+        for (i, &mask) in STRAIGHTS.iter().enumerate() {
+            flush5[mask as usize] = 1 + i as u16;
+            unsuited5.insert(mask_product(mask), STRAIGHT + i as u16);
+        }
+        for (i, &mask) in distinct.iter().enumerate() {
+            flush5[mask as usize] = FLUSH + i as u16;
+            unsuited5.insert(mask_product(mask), HIGH_CARD + i as u16);
+        }
+
+        let p = |r: usize| PRIMES[r] as u64;
+        let desc = || (0..13).rev();
+
+        let mut rank = FOUR_OF_A_KIND;
+        for q in desc() {
+            for k in desc().filter(|&k| k != q) {
+                unsuited5.insert(p(q).pow(4) * p(k), rank);
+                rank += 1;
+            }
+        }
+        debug_assert_eq!(rank, FULL_HOUSE);
+        for t in desc() {
+            for d in desc().filter(|&d| d != t) {
+                unsuited5.insert(p(t).pow(3) * p(d).pow(2), rank);
+                rank += 1;
+            }
+        }
+
+        rank = THREE_OF_A_KIND;
+        for t in desc() {
+            for k1 in desc().filter(|&k| k != t) {
+                for k2 in (0..k1).rev().filter(|&k| k != t) {
+                    unsuited5.insert(p(t).pow(3) * p(k1) * p(k2), rank);
+                    rank += 1;
+                }
+            }
+        }
+        debug_assert_eq!(rank, TWO_PAIR);
+        for p1 in desc() {
+            for p2 in (0..p1).rev() {
+                for k in desc().filter(|&k| k != p1 && k != p2) {
+                    unsuited5.insert(p(p1).pow(2) * p(p2).pow(2) * p(k), rank);
+                    rank += 1;
+                }
+            }
+        }
+        debug_assert_eq!(rank, ONE_PAIR);
+        for d in desc() {
+            for k1 in desc().filter(|&k| k != d) {
+                for k2 in (0..k1).rev().filter(|&k| k != d) {
+                    for k3 in (0..k2).rev().filter(|&k| k != d) {
+                        unsuited5.insert(p(d).pow(2) * p(k1) * p(k2) * p(k3), rank);
+                        rank += 1;
+                    }
+                }
+            }
+        }
+        debug_assert_eq!(rank, HIGH_CARD);
+
+        // 7 cards flush table: best 5 cards subset of every 5, 6 or 7 cards suit
+        let mut flush = vec![0u16; 1 << 13];
+        for mask in 0u16..1 << 13 {
+            if mask.count_ones() < 5 {
+                continue;
+            }
+            let mut best = u16::MAX;
+            let mut sub = mask;
+            while sub != 0 {
+                if sub.count_ones() == 5 {
+                    best = best.min(flush5[sub as usize]);
+                }
+                sub = (sub - 1) & mask;
+            }
+            flush[mask as usize] = best;
+        }
+
+        // 7 cards unsuited table: best 5 cards subset of every multiset of 7 ranks, by sum of rank keys
+        let mut ranked: Vec<(u32, u16)> = Vec::new();
+        let mut ranks = [0usize; 7];
+        fill_multisets(&mut ranks, 0, 0, &mut |ranks| {
+            let mut best = u16::MAX;
+            for skip1 in 0..7 {
+                for skip2 in skip1 + 1..7 {
+                    let product: u64 = (0..7)
+                        .filter(|&i| i != skip1 && i != skip2)
+                        .map(|i| p(ranks[i]))
+                        .product();
+                    best = best.min(unsuited5[&product]);
+                }
+            }
+            ranked.push((ranks.iter().map(|&r| RANK_KEYS[r]).sum(), best));
+        });
+
+        // Row displacement: rows are placed from the fullest one at the first offset where none
+        // of their columns is taken
+        let max_key = RANK_KEYS[12] * 4 + RANK_KEYS[11] * 3;
+        let mut by_row: Vec<Vec<(u32, u16)>> = vec![Vec::new(); (max_key >> ROW_SHIFT) as usize + 1];
+        for &(key, rank) in &ranked {
+            by_row[(key >> ROW_SHIFT) as usize].push((key & ((1 << ROW_SHIFT) - 1), rank));
+        }
+        let mut order: Vec<usize> = (0..by_row.len()).filter(|&row| !by_row[row].is_empty()).collect();
+        order.sort_by_key(|&row| std::cmp::Reverse(by_row[row].len()));
+
+        let mut rows = vec![0u16; by_row.len()];
+        let mut unsuited: Vec<u16> = Vec::new();
+        // Occupancy bitmap of unsuited, a row fits at an offset when its columns mask doesn't
+        // meet the 64 bits window starting there
+        let mut taken: Vec<u64> = vec![0; 2];
+        let (mut hint, mut hint_len) = (0, 0);
+        for row in order {
+            let cols = &by_row[row];
+            let mask = cols.iter().fold(0u64, |mask, &(col, _)| mask | 1 << col);
+            debug_assert_eq!(mask.count_ones() as usize, cols.len(), "rank keys sums collide");
+            let min_col = mask.trailing_zeros() as usize;
+
+            // Only offsets putting the lowest column on a free slot are tried, starting from the
+            // offset of the previous row of the same size
+            if cols.len() != hint_len {
+                (hint, hint_len) = (0, cols.len());
+            }
+            let mut slot = hint + min_col;
+            let offset = loop {
+                if taken.len() < slot / 64 + 2 {
+                    taken.resize(slot / 64 + 2, 0);
+                }
+                let free = !taken[slot / 64] & (!0u64 << (slot % 64));
+                if free == 0 {
+                    slot = (slot / 64 + 1) * 64;
+                } else {
+                    slot = slot / 64 * 64 + free.trailing_zeros() as usize;
+                    let (w, b) = ((slot - min_col) / 64, (slot - min_col) % 64);
+                    let window = if b == 0 { taken[w] } else { taken[w] >> b | taken[w + 1] << (64 - b) };
+                    if window & mask == 0 {
+                        break slot - min_col;
+                    }
+                    slot += 1;
+                }
+            };
+
+            let (w, b) = (offset / 64, offset % 64);
+            taken[w] |= mask << b;
+            if b != 0 {
+                taken[w + 1] |= mask >> (64 - b);
+            }
+            let end = offset + 64 - mask.leading_zeros() as usize;
+            if unsuited.len() < end {
+                unsuited.resize(end, 0);
+            }
+            for &(col, rank) in cols {
+                unsuited[offset + col as usize] = rank;
+            }
+            debug_assert!(offset <= u16::MAX as usize);
+            rows[row] = offset as u16;
+            hint = offset;
+        }
+
+        Evaluator { flush, rows, unsuited }
+    }
+
+    /// Evaluate every pair of hole cards against the same board, the board is only scanned once
+    pub fn evaluate_board<'a>(
+        &self,
+        board: &[u32; 5],
+        hole_cards: impl IntoIterator<Item = &'a [u32]>,
+    ) -> Vec<u16> {
+        let mut shared = PartialHand::new();
+        for &card in board {
+            shared.add(card);
+        }
+
+        hole_cards
+            .into_iter()
+            .map(|cards| {
+                let mut hand = shared.clone();
+                for &card in cards {
+                    hand.add(card);
+                }
+                self.rank(&hand)
+            })
+            .collect()
+    }
+
+    fn rank(&self, hand: &PartialHand) -> u16 {
+        // With 7 cards a flush can't coexist with four of a kind or a full house
+        match hand.suit_counts.iter().position(|&n| n >= 5) {
+            Some(suit) => self.flush[hand.suit_masks[suit] as usize],
+            None => {
+                let row = self.rows[(hand.key >> ROW_SHIFT) as usize] as usize;
+                self.unsuited[row + (hand.key & ((1 << ROW_SHIFT) - 1)) as usize]
+            }
+        }
+    }
+}
+
+// Suit counts, rank bits per suit and sum of rank keys of the cards seen so far
+#[derive(Clone)]
+struct PartialHand {
+    suit_counts: [u8; 4],
+    suit_masks: [u32; 4],
+    key: u32,
+}
+
+impl PartialHand {
+    fn new() -> Self {
+        PartialHand { suit_counts: [0; 4], suit_masks: [0; 4], key: 0 }
+    }
+
+    #[inline]
+    fn add(&mut self, card: u32) {
+        let suit = ((card >> 12) & 0xF).trailing_zeros() as usize;
+        self.suit_counts[suit] += 1;
+        self.suit_masks[suit] |= card >> 16;
+        self.key += RANK_KEYS[((card >> 8) & 0xF) as usize];
+    }
+}
+
+/// Shared evaluator, tables are built on first use
+pub fn evaluator() -> &'static Evaluator {
+    static EVALUATOR: OnceLock<Evaluator> = OnceLock::new();
+    EVALUATOR.get_or_init(Evaluator::new)
+}
+
+fn mask_product(mask: u16) -> u64 {
+    (0..13)
+        .filter(|r| mask & (1 << r) != 0)
+        .map(|r| PRIMES[r] as u64)
+        .product()
+}
+
+// Call f on every non decreasing sequence of 7 ranks using each rank at most 4 times
+fn fill_multisets(ranks: &mut [usize; 7], pos: usize, min_rank: usize, f: &mut impl FnMut(&[usize; 7])) {
+    if pos == 7 {
+        f(ranks);
+        return;
+    }
+    for r in min_rank..13 {
+        if pos >= 4 && ranks[pos - 4] == r {
+            continue;
+        }
+        ranks[pos] = r;
+        fill_multisets(ranks, pos + 1, r, f);
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    // Every 7 cards hand: number of hands per category and of distinct ranks
+    #[test]
+    fn all_seven_cards_hands() {
+        let e = evaluator();
+        let mut seen = vec![false; 7463];
+        let mut categories = [0u64; 9];
+        let bounds = [FOUR_OF_A_KIND, FULL_HOUSE, FLUSH, STRAIGHT, THREE_OF_A_KIND, TWO_PAIR, ONE_PAIR, HIGH_CARD];
+
+        let mut hands = vec![PartialHand::new(); 8];
+        let mut idx = [0usize; 7];
+        let mut depth = 0;
+        idx[0] = 0;
+        loop {
+            if idx[depth] > 52 - 7 + depth {
+                if depth == 0 {
+                    break;
+                }
+                depth -= 1;
+                idx[depth] += 1;
+                continue;
+            }
+            let mut hand = hands[depth].clone();
+            hand.add(DECK[idx[depth]]);
+            if depth == 6 {
+                let rank = e.rank(&hand);
+                seen[rank as usize] = true;
+                categories[bounds.iter().take_while(|&&b| rank >= b).count()] += 1;
+                idx[depth] += 1;
+            } else {
+                hands[depth + 1] = hand;
+                idx[depth + 1] = idx[depth] + 1;
+                depth += 1;
+            }
+        }
+
+        assert_eq!(
+            categories,
+            [41584, 224848, 3473184, 4047644, 6180020, 6461620, 31433400, 58627800, 23294460],
+        );
+        assert_eq!(seen.iter().filter(|&&s| s).count(), 4824);
+    }
+
+    #[test]
+    fn evaluate_board_orders_hands() {
+        let card = |s: &str| DECK.iter().copied().find(|&c| card_to_string(c) == s).unwrap();
+        let board = ["Ah", "Kh", "Qh", "7c", "2d"].map(card);
+        let royal = [card("Jh"), card("Th")];
+        let trips = [card("Ad"), card("As")];
+        let high = [card("3s"), card("4s")];
+        let ranks = evaluator().evaluate_board(&board, [&royal[..], &trips[..], &high[..]]);
+        assert_eq!(ranks[0], 1);
+        assert!(ranks[1] < ranks[2]);
+    }
+}
@@ -1,72 +1,71 @@
 use pyo3::prelude::*;
+use rand::rngs::SmallRng;
 use rand::seq::SliceRandom;
-use rand::thread_rng;
+use rand::SeedableRng;
 use pyo3::types::{PyDict, PyTuple};
-use pyo3::ToPyObject;
-use rs_poker::core::{Hand, Rankable, Rank};
-use std::cmp::Reverse;
+use pyo3::{intern, ToPyObject};
 
-#[derive(Debug, Clone, PartialEq)]
+mod evaluator;
+mod state;
+
+use state::{StateCache, RING};
+
+/// Actions are exchanged with the agents as small ints, also exported as FOLD, CHECK, CALL, RAISE
+#[derive(Debug, Clone, Copy, PartialEq)]
 #[pyclass]
 pub enum Action {
     #[pyo3(name = "FOLD")]
-    Fold,
+    Fold = 0,
     #[pyo3(name = "CHECK")]
-    Check,
+    Check = 1,
     #[pyo3(name = "CALL")]
-    Call,
+    Call = 2,
     #[pyo3(name = "RAISE")]
-    Raise,
+    Raise = 3,
 }
 
 impl ToPyObject for Action {
     fn to_object(&self, py: Python) -> PyObject {
-        match self {
-            Action::Fold => "fold".to_object(py),
-            Action::Check => "check".to_object(py),
-            Action::Call => "call".to_object(py),
-            Action::Raise => "raise".to_object(py),
-        }
+        (*self as u8).to_object(py)
     }
 }
 
-#[derive(Debug, Clone, PartialEq)]
+/// Phases are exposed to the agents as small ints, also exported as PREFLOP, FLOP, TURN, RIVER, SHOWDOWN
+#[derive(Debug, Clone, Copy, PartialEq)]
 #[pyclass]
 pub enum Phase {
     #[pyo3(name = "PREFLOP")]
-    Preflop,
+    Preflop = 0,
     #[pyo3(name = "FLOP")]
-    Flop,
+    Flop = 1,
     #[pyo3(name = "TURN")]
-    Turn,
+    Turn = 2,
     #[pyo3(name = "RIVER")]
-    River,
+    River = 3,
     #[pyo3(name = "SHOWDOWN")]
-    Showdown,
+    Showdown = 4,
 }
 
 impl ToPyObject for Phase {
     fn to_object(&self, py: Python) -> PyObject {
-        match self {
-            Phase::Preflop => "preflop".to_object(py),
-            Phase::Flop => "flop".to_object(py),
-            Phase::Turn => "turn".to_object(py),
-            Phase::River => "river".to_object(py),
-            Phase::Showdown => "showdown".to_object(py),
-        }
+        (*self as u8).to_object(py)
     }
 }
 
 #[pyclass]
 pub struct PokerEnv {
-    #[pyo3(get, set)]
+    #[pyo3(get)]
     agents: Vec<PyObject>,
-    #[pyo3(get, set)]
-    dead_agents: Vec<PyObject>,
+    // All agents share one class with `supports_batch` set, agents can't change after new
+    batched: bool,
     #[pyo3(get, set)]
     names: Vec<String>,
-    #[pyo3(get, set)]
-    dead_names: Vec<String>,
+    #[pyo3(get)]
+    alive: Vec<bool>,
+    #[pyo3(get)]
+    num_seats: usize,
+    next_seat: Vec<usize>,
+    prev_seat: Vec<usize>,
     #[pyo3(get)]
     num_players: usize,
     #[pyo3(get)]
@@ -76,16 +75,18 @@ pub struct PokerEnv {
     #[pyo3(get)]
     max_raise: i32,
     #[pyo3(get)]
+    max_bet: i32,
+    #[pyo3(get)]
     initial_stack: i32,
     #[pyo3(get, set)]
     stacks: Vec<i32>,
     #[pyo3(get, set)]
     dealer_pos: usize,
-    #[pyo3(get, set)]
+    #[pyo3(get)]
     bets: Vec<i32>,
-    #[pyo3(get, set)]
+    #[pyo3(get)]
     folded: Vec<bool>,
-    #[pyo3(get, set)]
+    #[pyo3(get)]
     all_in: Vec<bool>,
     #[pyo3(get, set)]
     rewards: Vec<i32>,
@@ -93,35 +94,52 @@ pub struct PokerEnv {
     current_phase: Phase,
     #[pyo3(get, set)]
     current_player: usize,
+    #[pyo3(get)]
+    deck: Vec<u32>,
+    #[pyo3(get)]
+    deck_idx: usize,
     #[pyo3(get, set)]
-    deck: Vec<String>,
-    #[pyo3(get, set)]
-    player_cards: Vec<Vec<String>>,
-    #[pyo3(get, set)]
-    community_cards: Vec<String>,
+    community_cards: Vec<u32>,
+    // Kept in sync with folded and all_in, which are read only from Python for that reason
+    num_folded: usize,
+    num_all_in: usize,
+    // Bumped by every action changing bets, folded or all_in
+    table_version: u64,
+    rng: SmallRng,
+    state: Vec<StateCache>,
+    state_idx: usize,
 }
 
 #[pymethods]
 impl PokerEnv {
     #[new]
-    /// Init poker env
+    #[pyo3(signature = (agents, small_blind, big_blind, initial_stack, seed=None))]
+    /// Init poker env, `seed` makes the shuffles reproducible
     pub fn new(
-        _py: Python,
+        py: Python,
         agents: Vec<PyObject>,
         small_blind: i32,
         big_blind: i32,
         initial_stack: i32,
+        seed: Option<u64>,
     ) -> PyResult<Self> {
         let num_players = agents.len();
+        if 2 * num_players + 5 > 52 {
+            return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>("Error: too many players for one deck"));
+        }
         let mut poker_env = PokerEnv {
+            batched: supports_batch(py, &agents)?,
             agents: agents.clone(),
-            dead_agents: Vec::new(),
-            num_players: agents.len(),
             names: (0..num_players).map(|i| format!("player_{}", (b'A' + i as u8) as char)).collect(),
-            dead_names: Vec::new(),
+            alive: vec![true; num_players],
+            num_seats: num_players,
+            next_seat: (0..num_players).map(|i| (i + 1) % num_players).collect(),
+            prev_seat: (0..num_players).map(|i| (i + num_players - 1) % num_players).collect(),
+            num_players,
             small_blind,
             big_blind,
             max_raise: 0,
+            max_bet: 0,
             initial_stack,
             stacks: vec![initial_stack; num_players],
             dealer_pos: 0,
@@ -131,9 +149,18 @@ impl PokerEnv {
             rewards: vec![0; num_players],
             current_phase: Phase::Preflop,
             current_player: 0,
-            deck: Vec::new(),
-            player_cards: vec![Vec::new(); num_players],
-            community_cards: Vec::new(),
+            deck: evaluator::DECK.to_vec(),
+            deck_idx: 0,
+            community_cards: Vec::with_capacity(5),
+            num_folded: 0,
+            num_all_in: 0,
+            table_version: 0,
+            rng: match seed {
+                Some(seed) => SmallRng::seed_from_u64(seed),
+                None => SmallRng::from_entropy(),
+            },
+            state: (0..RING).map(|_| StateCache::new(py)).collect::<PyResult<_>>()?,
+            state_idx: 0,
         };
 
         poker_env.reset()?;
@@ -142,43 +169,34 @@ impl PokerEnv {
 
     /// Reset the env for a new round
     pub fn reset(&mut self) -> PyResult<()> {
-        // Reset game state
-        self.bets = vec![0; self.num_players];
-        self.folded = vec![false; self.num_players];
-        self.all_in = vec![false; self.num_players];
-        self.rewards = vec![0; self.num_players];
+        // Reset game state, dead players sit the hand out as folded
+        self.bets.fill(0);
+        for (folded, &alive) in self.folded.iter_mut().zip(&self.alive) {
+            *folded = !alive;
+        }
+        self.all_in.fill(false);
+        self.rewards.fill(0);
+        self.max_bet = 0;
+        self.num_folded = self.num_seats - self.num_players;
+        self.num_all_in = 0;
         self.current_phase = Phase::Preflop;
-        self.dealer_pos = (self.dealer_pos + 1) % self.num_players;
-        self.current_player = (self.dealer_pos + 3) % self.num_players;
+        self.dealer_pos = self.next_seat[self.dealer_pos];
 
-        // Create and shuffle deck
-        let ranks = vec!["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"];
-        let suits = vec!["h", "d", "c", "s"];
-        self.deck = ranks
-            .iter()
-            .flat_map(|&rank| suits.iter().map(move |&suit| format!("{}{}", rank, suit)))
-            .collect::<Vec<String>>();
-        self.deck.shuffle(&mut thread_rng());
-
-        // Distribute private cards
-        self.player_cards = vec![Vec::new(); self.num_players];
-        for i in 0..self.num_players {
-            self.player_cards[i] = vec![
-                self.deck.pop().ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty"))?,
-                self.deck.pop().ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty"))?,
-            ];
-        }
+        // Shuffle the deck in place, the first two cards of each seat are its private cards
+        self.deck.shuffle(&mut self.rng);
+        self.deck_idx = 2 * self.num_seats;
 
-        // Reset community cards
-        self.community_cards = Vec::new();
+        // Reset community cards, keeping the allocation
+        self.community_cards.clear();
 
         // Force blinds
-        let sb_pos = (self.dealer_pos + 1) % self.num_players;
-        let bb_pos = (self.dealer_pos + 2) % self.num_players;
+        let sb_pos = self.next_seat[self.dealer_pos];
+        let bb_pos = self.next_seat[sb_pos];
+        self.current_player = self.next_seat[bb_pos];
         self.apply_bet(sb_pos, self.small_blind.min(self.stacks[sb_pos]))?;
         self.apply_bet(bb_pos, self.big_blind.min(self.stacks[bb_pos]))?;
 
-        self.max_raise = self.bets.iter().max().copied().unwrap_or(0);
+        self.max_raise = self.max_bet;
 
         Ok(())
     }
@@ -186,91 +204,64 @@ impl PokerEnv {
     /// Apply a bet for a player
     pub fn apply_bet(&mut self, player: usize, amount: i32) -> PyResult<()> {
         self.bets[player] = amount;
-        if self.stacks[player] - self.bets[player] == 0 {
+        if amount > self.max_bet {
+            self.max_bet = amount;
+        }
+        if self.stacks[player] - self.bets[player] == 0 && !self.all_in[player] {
             self.all_in[player] = true;
+            self.num_all_in += 1;
         }
         Ok(())
     }
 
-    /// Return all available actions for the current player
-    pub fn get_available_actions(&mut self) -> PyResult<Vec<Py<PyTuple>>> {
-        let mut actions: Vec<Py<PyTuple>> = Vec::new();
-        let current_bet = self.bets[self.current_player];
-        let current_stack = self.stacks[self.current_player];
-        let max_bet = self.bets.iter().max().copied().unwrap_or(0);
-
-        // No action if all in
-        if self.all_in[self.current_player] {
-            return Ok(actions);
-        };
-
-        // Always fold
-        Python::with_gil(|py| {
-            actions.push(PyTuple::new_bound(py, [Action::Fold.to_object(py)]).into());
-        });
-
-        let sum_all_in: usize = self.all_in.iter().map(|&b| b as usize).sum();
-        let sum_folded: usize = self.folded.iter().map(|&b| b as usize).sum();
-
-        if sum_all_in + sum_folded == self.folded.len() - 1 {
-            if current_bet != max_bet {
-                let call_amount = max_bet.min(current_stack);
-                Python::with_gil(|py| {
-                    actions.push(PyTuple::new_bound(py, [Action::Call.to_object(py), call_amount.to_object(py)]).into());
-                });
-            }
-            return Ok(actions)
-        };
-
-        // "Check" is the bet of the player is equal to the max_bet, "Call" if not
-        if current_bet == max_bet {
-            Python::with_gil(|py| {
-                actions.push(PyTuple::new_bound(py, [Action::Check.to_object(py)]).into());
-            });
-        } else {
-            let call_amount = max_bet.min(current_stack);
-            Python::with_gil(|py| {
-                actions.push(PyTuple::new_bound(py, [Action::Call.to_object(py), call_amount.to_object(py)]).into());
-            });
-        };
-
-        if current_stack > max_bet {
-            let raise_range: (i32, i32);
-            if current_stack >= max_bet*2 {
-                raise_range = (max_bet + self.max_raise, current_stack);
-            } else {
-                raise_range = (current_stack, current_stack);
-            }
-            Python::with_gil(|py| {
-                actions.push(PyTuple::new_bound(py, [Action::Raise.to_object(py), raise_range.to_object(py)]).into());
-            });
-        };
+    /// Private cards of every seat, empty for dead players
+    #[getter]
+    pub fn player_cards(&self) -> Vec<Vec<u32>> {
+        (0..self.num_seats)
+            .map(|p| if self.alive[p] { self.hole_cards(p).to_vec() } else { Vec::new() })
+            .collect()
+    }
 
-        Ok(actions)
+    /// Return all available actions for the current player
+    pub fn get_available_actions(&mut self, py: Python) -> PyResult<Vec<Py<PyTuple>>> {
+        self.actions_for(py, self.current_player)
     }
 
     /// Return observable state of game from the POV of the current player
-    pub fn get_state(&mut self) -> PyResult<Py<PyDict>> {
-        Python::with_gil(|py| {
-            let dict = PyDict::new_bound(py);
-            dict.set_item("player_cards", self.player_cards[self.current_player].clone())?;
-            dict.set_item("community_cards", self.community_cards.clone())?;
-            dict.set_item("stacks", self.stacks.clone())?;
-            dict.set_item("bets", self.bets.clone())?;
-            dict.set_item("phase", &self.current_phase)?;
-            dict.set_item("current_player", self.current_player)?;
-            dict.set_item("folded", self.folded.clone())?;
-            dict.set_item("all_in", self.all_in.clone())?;
-            Ok(dict.into())
-        })
+    ///
+    /// Dicts are taken from a ring of RING preallocated ones and refreshed in place: agents must
+    /// treat a state as read only, which is enforced by handing out a read only mapping of
+    /// tuples. A state stays valid for the next RING - 1 calls, agents must copy what they keep
+    /// longer (e.g. `dict(state)`)
+    pub fn get_state(&mut self, py: Python) -> PyResult<PyObject> {
+        let cache = &mut self.state[self.state_idx & (RING - 1)];
+        self.state_idx = self.state_idx.wrapping_add(1);
+        let dict = cache.dict.bind(py);
+        let p = self.current_player;
+        cache.player_cards.sync_into(dict, intern!(py, "player_cards"), &self.deck[2 * p..2 * p + 2])?;
+        cache.community_cards.sync_into(dict, intern!(py, "community_cards"), &self.community_cards)?;
+        cache.stacks.sync_into(dict, intern!(py, "stacks"), &self.stacks)?;
+        cache.bets.sync_into(dict, intern!(py, "bets"), &self.bets)?;
+        dict.set_item(intern!(py, "phase"), &self.current_phase)?;
+        dict.set_item(intern!(py, "current_player"), self.current_player)?;
+        cache.folded.sync_into(dict, intern!(py, "folded"), &self.folded)?;
+        cache.all_in.sync_into(dict, intern!(py, "all_in"), &self.all_in)?;
+        Ok(cache.view.clone_ref(py))
     }
 
     /// Print overall state
     pub fn overall_state(&mut self) -> PyResult<()> {
+        let player_cards: Vec<Vec<String>> = (0..self.num_seats)
+            .map(|p| self.hole_cards(p).iter().map(|&c| evaluator::card_to_string(c)).collect())
+            .collect();
+        let community_cards: Vec<String> = self.community_cards
+            .iter()
+            .map(|&c| evaluator::card_to_string(c))
+            .collect();
         println!("phase: {0:?}\nplayers_cards: {1:?}\ncommunity_cards: {2:?}\nfolded: {3:?}')\nall_in: {4:?}\nstacks: {5:?}\nbets: {6:?}\n",
                     self.current_phase,
-                    self.player_cards,
-                    self.community_cards,
+                    player_cards,
+                    community_cards,
                     self.folded,
                     self.all_in,
                     self.stacks,
@@ -279,75 +270,55 @@ impl PokerEnv {
     }
 
     /// Proceed 1 turn of bet
-    pub fn step_bid(&mut self, verbose: bool) -> PyResult<()> {
-        let mut last_bet = (self.current_player + self.num_players - 1) % self.num_players;
+    pub fn step_bid(&mut self, py: Python, verbose: bool) -> PyResult<()> {
+        let mut last_bet = self.prev_seat[self.current_player];
+
+        // Batched decisions are taken on the state at the start of the call, they are dropped as
+        // soon as an action changes the table so that no player acts on an outdated state
+        let mut batched = self.batch_decisions(py)?;
+        let batch_version = self.table_version;
+
         loop {
             if self.folded[self.current_player] {
                 if last_bet == self.current_player {
                     break;
                 }
-                self.current_player = (self.current_player + 1) % self.num_players;
+                self.current_player = self.next_seat[self.current_player];
                 continue;
             }
 
-            let agent = self.agents[self.current_player].clone();
-            let state = self.get_state()?;
-            let available_actions = self.get_available_actions()?;
+            let available_actions = self.get_available_actions(py)?;
 
             if available_actions.len() == 1 {
                 break;
             }
 
             if !available_actions.is_empty() {
-                // Call agent's choose_action method
-                let action = Python::with_gil(|py| {
-                    agent.call_method1(py, "choose_action", (state, available_actions))
-                })?;
+                let prefetched = match batched.as_mut() {
+                    Some(decisions) if self.table_version == batch_version => decisions[self.current_player].take(),
+                    _ => None,
+                };
+
+                // Call agent's choose_action method, the only part of the loop running Python
+                let action = match prefetched {
+                    Some(action) => action.into_bound(py),
+                    None => {
+                        let state = self.get_state(py)?;
+                        self.agents[self.current_player]
+                            .bind(py)
+                            .call_method1(intern!(py, "choose_action"), (state, available_actions))?
+                    }
+                };
 
                 if verbose {
                     println!("{} has {}", self.names[self.current_player], action)
                 }
 
-                // Extract the first element of the action tuple
-                let action_type = Python::with_gil(|py| {
-                    action
-                        .bind(py)
-                        .get_item(0)?
-                        .extract::<String>()
-                })?;
-
-                match action_type.as_str() {
-                    "fold" => {
-                        self.folded[self.current_player] = true;
-                    }
-                    "check" => {}
-                    "call" => {
-                        let amount = Python::with_gil(|py| {
-                            action.bind(py).get_item(1)?.extract::<i32>()
-                        })?;
-                        self.apply_bet(self.current_player, amount)?;
-                    }
-                    "raise" => {
-                        let amount = Python::with_gil(|py| {
-                            action.bind(py).get_item(1)?.extract::<i32>()
-                        })?;
-                        let raise_amount = amount - self.bets.iter().max().copied().unwrap_or(0);
-                        if raise_amount > self.max_raise {
-                            self.max_raise = raise_amount;
-                        }
-                        self.apply_bet(self.current_player, amount)?;
-                        last_bet = (self.current_player + self.num_players - 1) % self.num_players;
-                    }
-                    _ => {
-                        return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
-                            "Error: not valid action",
-                        ));
-                    }
-                }
+                let (kind, amount) = parse_action(&action)?;
+                last_bet = self.play_action(kind, amount, last_bet)?;
             }
 
-            let sum_folded: usize = self.folded.iter().map(|&b| b as usize).sum();
-            if sum_folded == self.folded.len() - 1 {
+            if self.num_folded == self.num_seats - 1 {
                 break;
             }
 
@@ -355,7 +326,7 @@ impl PokerEnv {
                 break;
             }
 
-            self.current_player = (self.current_player + 1) % self.num_players;
+            self.current_player = self.next_seat[self.current_player];
         }
 
         Ok(())
@@ -369,22 +340,18 @@ impl PokerEnv {
 
         match self.current_phase {
             Phase::Preflop => {
-                self.current_player = (self.dealer_pos + 1) % self.num_players;
-                self.community_cards = (0..3)
-                    .map(|_| self.deck.pop().ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty")))
-                    .collect::<PyResult<Vec<_>>>()?;
+                self.current_player = self.next_seat[self.dealer_pos];
+                self.deal_board(3)?;
                 self.current_phase = Phase::Flop;
             }
             Phase::Flop => {
-                self.current_player = (self.dealer_pos + 1) % self.num_players;
-                let card = self.deck.pop().ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty"))?;
-                self.community_cards.push(card);
+                self.current_player = self.next_seat[self.dealer_pos];
+                self.deal_board(1)?;
                 self.current_phase = Phase::Turn;
             }
             Phase::Turn => {
-                self.current_player = (self.dealer_pos + 1) % self.num_players;
-                let card = self.deck.pop().ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty"))?;
-                self.community_cards.push(card);
+                self.current_player = self.next_seat[self.dealer_pos];
+                self.deal_board(1)?;
                 self.current_phase = Phase::River;
             }
             Phase::River => {
@@ -399,47 +366,45 @@ impl PokerEnv {
     }
 
     /// Kill a player (when he has no stack left)
-    pub fn kill(&mut self, player: usize) -> PyResult<()> { 
-        self.stacks.remove(player);
-        self.bets.remove(player);
-        self.dead_agents.push(self.agents.remove(player));
-        self.dead_names.push(self.names.remove(player));
-        self.folded.remove(player);
-        self.all_in.remove(player);
-        self.rewards.remove(player);
-        self.player_cards.remove(player);
-        self.num_players -= 1;
+    pub fn kill(&mut self, player: usize) -> PyResult<()> {
+        if self.alive[player] {
+            self.alive[player] = false;
+            if !self.folded[player] {
+                self.folded[player] = true;
+                self.num_folded += 1;
+            }
+            self.num_players -= 1;
+            self.update_seats();
+        }
         Ok(())
     }
 
     /// Determine winner(s) and conclude a game
     pub fn resolution(&mut self, verbose: bool) -> PyResult<()> {
-        let mut scores: Vec<(String, Rank)> = Vec::new();
         let stacks_before_resolution = self.stacks.iter().sum::<i32>();
 
-        let board = self.community_cards.join("");
+        let board: &[u32; 5] = self.community_cards
+            .as_slice()
+            .try_into()
+            .map_err(|_| PyErr::new::<pyo3::exceptions::PyValueError, _>("Board is not complete"))?;
+        let contenders: Vec<usize> = (0..self.num_seats).filter(|&i| !self.folded[i]).collect();
+        let ranks = evaluator::evaluator()
+            .evaluate_board(board, contenders.iter().map(|&i| self.hole_cards(i)));
 
-        for i in 0..self.num_players {
-            if !self.folded[i] {
-                let player_cards = self.player_cards[i].clone().join("");
-                let hand = Hand::new_from_str(&format!("{}{}", board, player_cards)).unwrap();
-                let rank = hand.rank();
-                scores.push((self.names[i].clone(), rank));
-            }
-        }
-
-        scores.sort_by_key(|x| Reverse(x.1));
+        // (seat, rank), lower rank is a stronger hand
+        let mut scores: Vec<(usize, u16)> = contenders.into_iter().zip(ranks).collect();
+        scores.sort_by_key(|x| x.1);
 
+        // Players of each pot as a bitmask of seats
         let mut pots = vec![0];
-        let mut pots_names: Vec<Vec<String>> = vec![vec![]];
+        let mut pots_players: Vec<u64> = vec![0];
 
-        let sum_all_in: usize = self.all_in.iter().map(|&b| b as usize).sum();
-        if sum_all_in == 0 {
-            for i in 0..self.num_players {
+        if self.num_all_in == 0 {
+            for i in 0..self.num_seats {
                 pots[0] += self.bets[i];
 
                 if !self.folded[i] {
-                    pots_names[0].push(self.names[i].clone())
+                    pots_players[0] |= 1 << i;
                 }
             }
         } else {
@@ -460,19 +425,19 @@ impl PokerEnv {
                     .min();
 
                 if let Some(val) = min {
-                    for i in 0..self.num_players {
+                    for i in 0..self.num_seats {
                         let n = std::cmp::min(val, bets[i]);
                         if n != 0 {
                             bets[i] -= n;
                             pots[pot_index] += n;
 
                             if !self.folded[i] {
-                                pots_names[pot_index].push(self.names[i].clone());
+                                pots_players[pot_index] |= 1 << i;
                             }
                         }
                     }
                     pots.push(0);
-                    pots_names.push(Vec::new());
+                    pots_players.push(0);
                     pot_index += 1;
                 } else {
                     break;
@@ -481,73 +446,90 @@ impl PokerEnv {
         }
 
         if verbose {
+            let pots_names: Vec<Vec<&str>> = pots_players
+                .iter()
+                .map(|&players| {
+                    (0..self.num_seats)
+                        .filter(|&i| players & (1 << i) != 0)
+                        .map(|i| self.names[i].as_str())
+                        .collect()
+                })
+                .collect();
             println!("pots: {:?}\npots_player: {:?}", pots, pots_names);
         }
 
         // Distribute the pots
         let mut rest = 0;
-        let mut i = 0;
-        for p in pots {
+        for (i, (&p, &players)) in pots.iter().zip(&pots_players).enumerate() {
 
             if p == 0 {
                 continue;
             }
 
             // Determine pot winner(s)
-            let mut winners = Vec::new();
-            let mut rank: Option<Rank> = None;
-            for (name, r) in scores.clone() {
-                if pots_names[i].contains(&name) {
-                    if winners.len() == 0 {
-                        winners.push(name);
-                        rank = Some(r);
-                    } else {
-                        if Some(r) == rank {
-                            winners.push(name);
-                        } else {
-                            break;
+            let mut winners: u64 = 0;
+            let mut rank: Option<u16> = None;
+            for &(seat, r) in &scores {
+                if players & (1 << seat) != 0 {
+                    match rank {
+                        None => {
+                            winners |= 1 << seat;
+                            rank = Some(r);
                         }
+                        Some(best) if best == r => winners |= 1 << seat,
+                        Some(_) => break,
                     }
                 }
             }
 
             // Distribute gains
-            rest += p % (winners.len() as i32);
-            let takes = p / (winners.len() as i32);
+            let num_winners = winners.count_ones() as i32;
+            rest += p % num_winners;
+            let takes = p / num_winners;
 
-            for j in 0..self.num_players {
-                let agent_name = self.names[j as usize].clone();
-                if winners.contains(&agent_name) {
-                    self.stacks[j as usize] += takes;
+            for j in 0..self.num_seats {
+                if winners & (1 << j) != 0 {
+                    self.stacks[j] += takes;
                     if verbose {
-                        println!("Winner pot {}: {}", i, agent_name);
+                        println!("Winner pot {}: {}", i, self.names[j]);
                     }
                 }
             }
+        }
 
-            i += 1;
+        self.settle(verbose)?;
+
+        if self.stacks.iter().sum::<i32>() + rest != stacks_before_resolution {
+            panic!("Number of stack is not correct anymore!");
         }
 
-        let mut j: i32 = 0;
-        while (j as usize) < self.num_players {
-            let agent_name = self.names[j as usize].clone();
-            self.stacks[j as usize] -= self.bets[j as usize];
-            if self.stacks[j as usize] == 0 {
-                if verbose {
-                    println!("{} lost", agent_name);
-                }
-                self.kill(j as usize)?;
-                j -= 1;
-            }
-            j += 1;
+        Ok(())
+    }
+
+    /// Conclude a game won by the only player who didn't fold, without dealing the board
+    pub fn resolution_single_winner(&mut self, verbose: bool) -> PyResult<()> {
+        if self.num_folded != self.num_seats - 1 {
+            return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>("Error: more than one player left"));
         }
+        let stacks_before_resolution = self.stacks.iter().sum::<i32>();
+        let winner = self.folded.iter().position(|&folded| !folded).unwrap_or(0);
+
+        // Bets above the winner's one are uncalled and stay with their owner
+        let covered = self.bets[winner];
+        let mut pot = 0;
+        for bet in self.bets.iter_mut() {
+            *bet = (*bet).min(covered);
+            pot += *bet;
+        }
+        self.stacks[winner] += pot;
 
         if verbose {
-            println!("State of stacks: {:?}", self.stacks);
-            println!("{} player remaining", self.num_players);
+            println!("pot: {}\nWinner: {}", pot, self.names[winner]);
         }
 
-        if self.stacks.iter().sum::<i32>() + rest != stacks_before_resolution {
+        self.settle(verbose)?;
+
+        if self.stacks.iter().sum::<i32>() != stacks_before_resolution {
             panic!("Number of stack is not correct anymore!");
         }
 
@@ -556,17 +538,11 @@ impl PokerEnv {
 
     /// Revive all player to play another game
     pub fn revive(&mut self) -> PyResult<()> {
-        for a in self.dead_agents.clone() {
-            self.agents.push(a);
-        };
-        self.dead_agents = Vec::new();
-        for n in self.dead_names.clone() {
-            self.names.push(n)
-        };
-        self.dead_names = Vec::new();
-        self.num_players = self.agents.len();
+        self.alive.fill(true);
+        self.num_players = self.num_seats;
+        self.update_seats();
 
-        self.stacks = vec![self.initial_stack; self.num_players];
+        self.stacks.fill(self.initial_stack);
         self.dealer_pos = 0;
 
         self.reset()?;
@@ -574,28 +550,30 @@ impl PokerEnv {
         Ok(())
     }
 
-    /// play episode game(s) of poker
-    pub fn play_game(&mut self, episode: i32, verbose: bool) -> PyResult<()> {
-        let mut i = 1;
+    /// play episode game(s) of poker, a game lasts until a single player is left
+    pub fn play_game(&mut self, py: Python, episode: i32, verbose: bool) -> PyResult<()> {
+        for i in 1..=episode {
+            if i % 1000 == 0 {
+                println!("episode {} on {}", i, episode);
+            }
 
-        while i <= episode {
             while self.num_players > 1 {
                 self.reset()?;
 
                 loop {
-                    if i % 1000 == 0 {
-                        println!("episode {} on {}", i, episode);
-                    }
-
                     if verbose {
                         println!();
                         self.overall_state()?;
                     }
-                    i += 1;
 
-                    if self.folded.iter().filter(|&&b| b).count() != self.num_players - 1 {
-                        self.step_bid(verbose)?;
+                    self.step_bid(py, verbose)?;
+
+                    // Everybody else folded, no card to deal nor hand to compare
+                    if self.num_folded == self.num_seats - 1 {
+                        self.resolution_single_winner(verbose)?;
+                        break;
                     }
+
                     self.advance_phase(verbose)?;
 
                     if self.current_phase == Phase::Showdown {
@@ -616,10 +594,278 @@ impl PokerEnv {
     }
 }
 
+impl PokerEnv {
+    /// Return all available actions for `player`
+    fn actions_for(&self, py: Python, player: usize) -> PyResult<Vec<Py<PyTuple>>> {
+        let current_bet = self.bets[player];
+        let current_stack = self.stacks[player];
+        let max_bet = self.max_bet;
+
+        // No action if all in
+        if self.all_in[player] {
+            return Ok(Vec::new());
+        };
+
+        let inactive = self.num_folded + self.num_all_in;
+
+        let mut actions: Vec<Py<PyTuple>> = Vec::with_capacity(3);
+
+        // Always fold
+        actions.push(PyTuple::new_bound(py, [Action::Fold.to_object(py)]).into());
+
+        if inactive == self.num_seats - 1 {
+            if current_bet != max_bet {
+                let call_amount = max_bet.min(current_stack);
+                actions.push(PyTuple::new_bound(py, [Action::Call.to_object(py), call_amount.to_object(py)]).into());
+            }
+            return Ok(actions);
+        };
+
+        // "Check" is the bet of the player is equal to the max_bet, "Call" if not
+        if current_bet == max_bet {
+            actions.push(PyTuple::new_bound(py, [Action::Check.to_object(py)]).into());
+        } else {
+            let call_amount = max_bet.min(current_stack);
+            actions.push(PyTuple::new_bound(py, [Action::Call.to_object(py), call_amount.to_object(py)]).into());
+        };
+
+        if current_stack > max_bet {
+            let raise_range: (i32, i32);
+            if current_stack >= max_bet*2 {
+                raise_range = (max_bet + self.max_raise, current_stack);
+            } else {
+                raise_range = (current_stack, current_stack);
+            }
+            actions.push(PyTuple::new_bound(py, [Action::Raise.to_object(py), raise_range.to_object(py)]).into());
+        };
+
+        Ok(actions)
+    }
+
+    /// Standalone copy of the state seen by `player`, in the same read only shape as get_state
+    /// but safe to keep
+    fn snapshot_state(&self, py: Python, player: usize) -> PyResult<PyObject> {
+        let dict = PyDict::new_bound(py);
+        dict.set_item("player_cards", PyTuple::new_bound(py, self.hole_cards(player)))?;
+        dict.set_item("community_cards", PyTuple::new_bound(py, &self.community_cards))?;
+        dict.set_item("stacks", PyTuple::new_bound(py, &self.stacks))?;
+        dict.set_item("bets", PyTuple::new_bound(py, &self.bets))?;
+        dict.set_item("phase", &self.current_phase)?;
+        dict.set_item("current_player", player)?;
+        dict.set_item("folded", PyTuple::new_bound(py, &self.folded))?;
+        dict.set_item("all_in", PyTuple::new_bound(py, &self.all_in))?;
+        state::read_only(&dict)
+    }
+
+    /// Decisions of every player able to act, taken in a single `choose_actions_batch` call on
+    /// their agent class when all the agents share one class with `supports_batch` set
+    ///
+    /// Experimental: the decisions are dropped as soon as an action changes the table, so most of
+    /// them are thrown away (preflop only the first one can be used). It is not a speed up for
+    /// agents whose decisions are costly, a batch of independent envs would be the way to get one
+    fn batch_decisions(&self, py: Python) -> PyResult<Option<Vec<Option<PyObject>>>> {
+        if !self.batched {
+            return Ok(None);
+        }
+        let players: Vec<usize> = (0..self.num_seats)
+            .filter(|&p| !self.folded[p] && !self.all_in[p])
+            .collect();
+        if players.len() < 2 {
+            return Ok(None);
+        }
+
+        let cls = self.agents[players[0]].bind(py).get_type();
+
+        let states = players
+            .iter()
+            .map(|&p| self.snapshot_state(py, p))
+            .collect::<PyResult<Vec<_>>>()?;
+        let actions = players
+            .iter()
+            .map(|&p| self.actions_for(py, p))
+            .collect::<PyResult<Vec<_>>>()?;
+        let decisions: Vec<PyObject> = cls
+            .call_method1(intern!(py, "choose_actions_batch"), (states, actions))?
+            .extract()?;
+        if decisions.len() != players.len() {
+            return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+                "Error: choose_actions_batch must return one action per player",
+            ));
+        }
+
+        let mut by_seat: Vec<Option<PyObject>> = (0..self.num_seats).map(|_| None).collect();
+        for (p, decision) in players.into_iter().zip(decisions) {
+            by_seat[p] = Some(decision);
+        }
+        Ok(Some(by_seat))
+    }
+
+    /// Apply the action of the current player, return the new last bettor
+    fn play_action(&mut self, action: Action, amount: i32, last_bet: usize) -> PyResult<usize> {
+        let player = self.current_player;
+        if action != Action::Check {
+            self.table_version += 1;
+        }
+        match action {
+            Action::Fold => {
+                self.folded[player] = true;
+                self.num_folded += 1;
+            }
+            Action::Check => {}
+            Action::Call => {
+                self.apply_bet(player, amount)?;
+            }
+            Action::Raise => {
+                let raise_amount = amount - self.max_bet;
+                if raise_amount > self.max_raise {
+                    self.max_raise = raise_amount;
+                }
+                self.apply_bet(player, amount)?;
+                return Ok(self.prev_seat[player]);
+            }
+        }
+        Ok(last_bet)
+    }
+
+    /// Private cards of a seat, dealt as the seat's two cards at the front of the deck
+    fn hole_cards(&self, player: usize) -> &[u32] {
+        &self.deck[2 * player..2 * player + 2]
+    }
+
+    /// Take the bets out of the stacks and kill the players left without chips
+    fn settle(&mut self, verbose: bool) -> PyResult<()> {
+        for j in 0..self.num_seats {
+            if !self.alive[j] {
+                continue;
+            }
+            self.stacks[j] -= self.bets[j];
+            if self.stacks[j] == 0 {
+                if verbose {
+                    println!("{} lost", self.names[j]);
+                }
+                self.kill(j)?;
+            }
+        }
+
+        if verbose {
+            println!("State of stacks: {:?}", self.stacks);
+            println!("{} player remaining", self.num_players);
+        }
+
+        Ok(())
+    }
+
+    /// Deal the next `count` cards of the deck to the board
+    fn deal_board(&mut self, count: usize) -> PyResult<()> {
+        let cards = self.deck
+            .get(self.deck_idx..self.deck_idx + count)
+            .ok_or_else(|| PyErr::new::<pyo3::exceptions::PyValueError, _>("Deck is empty"))?;
+        self.community_cards.extend_from_slice(cards);
+        self.deck_idx += count;
+        Ok(())
+    }
+
+    /// Rebuild the tables of the next and previous alive seat of every seat
+    fn update_seats(&mut self) {
+        let n = self.num_seats;
+        for seat in 0..n {
+            self.next_seat[seat] = (1..=n)
+                .map(|k| (seat + k) % n)
+                .find(|&s| self.alive[s])
+                .unwrap_or(seat);
+            self.prev_seat[seat] = (1..=n)
+                .map(|k| (seat + n - k) % n)
+                .find(|&s| self.alive[s])
+                .unwrap_or(seat);
+        }
+    }
+}
+
+/// Whether every agent is an instance of the same class and that class sets `supports_batch`
+fn supports_batch(py: Python, agents: &[PyObject]) -> PyResult<bool> {
+    let Some(first) = agents.first() else { return Ok(false) };
+    let cls = first.bind(py).get_type();
+    for agent in &agents[1..] {
+        if !agent.bind(py).get_type().is(&cls) {
+            return Ok(false);
+        }
+    }
+    match cls.getattr(intern!(py, "supports_batch")) {
+        Ok(flag) => flag.is_truthy(),
+        Err(_) => Ok(false),
+    }
+}
+
+/// Decode the (action, amount) tuple returned by an agent
+fn parse_action(action: &Bound<'_, PyAny>) -> PyResult<(Action, i32)> {
+    let kind = match action.get_item(0)?.extract::<u8>()? {
+        0 => Action::Fold,
+        1 => Action::Check,
+        2 => Action::Call,
+        3 => Action::Raise,
+        _ => {
+            return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+                "Error: not valid action",
+            ));
+        }
+    };
+    let amount = match kind {
+        Action::Call | Action::Raise => action.get_item(1)?.extract::<i32>()?,
+        _ => 0,
+    };
+    Ok((kind, amount))
+}
+
+/// Readable form of a card as found in the state ("Ah", "Td", ...)
+#[pyfunction]
+fn card_to_string(card: u32) -> String {
+    evaluator::card_to_string(card)
+}
+
 #[pymodule]
 fn rust_poker_env(_py: Python, m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<Action>()?;
+    m.add("FOLD", Action::Fold as u8)?;
+    m.add("CHECK", Action::Check as u8)?;
+    m.add("CALL", Action::Call as u8)?;
+    m.add("RAISE", Action::Raise as u8)?;
     m.add_class::<Phase>()?;
+    m.add("PREFLOP", Phase::Preflop as u8)?;
+    m.add("FLOP", Phase::Flop as u8)?;
+    m.add("TURN", Phase::Turn as u8)?;
+    m.add("RIVER", Phase::River as u8)?;
+    m.add("SHOWDOWN", Phase::Showdown as u8)?;
+    m.add("DECK", evaluator::DECK.to_vec())?;
+    m.add_function(wrap_pyfunction!(card_to_string, m)?)?;
     m.add_class::<PokerEnv>()?;
     Ok(())
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    // The last player in is all in below the bet of a player who folded afterwards
+    #[test]
+    fn single_winner_all_in_below_folded_bet() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|py| {
+            let agents = (0..3).map(|_| py.None()).collect();
+            let mut env = PokerEnv::new(py, agents, 10, 20, 100, Some(0)).unwrap();
+            env.stacks = vec![50, 100, 100];
+            env.bets = vec![50, 80, 20];
+            env.folded = vec![false, true, true];
+            env.all_in = vec![true, false, false];
+            env.num_folded = 2;
+            env.num_all_in = 1;
+
+            env.resolution_single_winner(false).unwrap();
+
+            // Winner takes its 50 back plus 50 from seat 1 and 20 from seat 2, seat 1 gets the
+            // uncalled 30 back
+            assert_eq!(env.stacks, vec![120, 50, 80]);
+            assert_eq!(env.stacks.iter().sum::<i32>(), 250);
+            assert_eq!(env.num_players, 3);
+        });
+    }
+}
@@ -0,0 +1,79 @@
+use pyo3::intern;
+use pyo3::prelude::*;
+use pyo3::types::{PyDict, PyString, PyTuple};
+
+/// Python tuple mirroring a Rust slice, only rebuilt when one of the values changed
+pub struct CachedTuple<T> {
+    tuple: Py<PyTuple>,
+    values: Vec<T>,
+}
+
+impl<T: Copy + PartialEq + ToPyObject> CachedTuple<T> {
+    fn new(py: Python, values: &[T]) -> Self {
+        CachedTuple {
+            tuple: PyTuple::new_bound(py, values).unbind(),
+            values: values.to_vec(),
+        }
+    }
+
+    /// Refresh `dict[key]` from `values`, the tuple is immutable so the cached values can't go stale
+    pub fn sync_into(&mut self, dict: &Bound<'_, PyDict>, key: &Bound<'_, PyString>, values: &[T]) -> PyResult<()> {
+        if self.values.as_slice() == values {
+            return Ok(());
+        }
+        *self = Self::new(dict.py(), values);
+        dict.set_item(key, &self.tuple)
+    }
+}
+
+/// Number of state dicts get_state cycles through, a power of two
+pub const RING: usize = 16;
+
+/// Dict handed to the agents by get_state, allocated once and refreshed in place
+pub struct StateCache {
+    pub dict: Py<PyDict>,
+    /// Read only `types.MappingProxyType` over `dict`, what the agents actually get
+    pub view: PyObject,
+    pub player_cards: CachedTuple<u32>,
+    pub community_cards: CachedTuple<u32>,
+    pub stacks: CachedTuple<i32>,
+    pub bets: CachedTuple<i32>,
+    pub folded: CachedTuple<bool>,
+    pub all_in: CachedTuple<bool>,
+}
+
+impl StateCache {
+    pub fn new(py: Python) -> PyResult<Self> {
+        let dict = PyDict::new_bound(py);
+        let view = read_only(&dict)?;
+        let cache = StateCache {
+            dict: dict.unbind(),
+            view,
+            player_cards: CachedTuple::new(py, &[]),
+            community_cards: CachedTuple::new(py, &[]),
+            stacks: CachedTuple::new(py, &[]),
+            bets: CachedTuple::new(py, &[]),
+            folded: CachedTuple::new(py, &[]),
+            all_in: CachedTuple::new(py, &[]),
+        };
+
+        let dict = cache.dict.bind(py);
+        dict.set_item("player_cards", &cache.player_cards.tuple)?;
+        dict.set_item("community_cards", &cache.community_cards.tuple)?;
+        dict.set_item("stacks", &cache.stacks.tuple)?;
+        dict.set_item("bets", &cache.bets.tuple)?;
+        dict.set_item("folded", &cache.folded.tuple)?;
+        dict.set_item("all_in", &cache.all_in.tuple)?;
+        Ok(cache)
+    }
+}
+
+/// Read only `types.MappingProxyType` over `dict`, the shape every state is handed out in
+pub fn read_only(dict: &Bound<'_, PyDict>) -> PyResult<PyObject> {
+    let py = dict.py();
+    Ok(py
+        .import_bound(intern!(py, "types"))?
+        .getattr(intern!(py, "MappingProxyType"))?
+        .call1((dict,))?
+        .unbind())
+}